@@ -1,24 +1,33 @@
 import dataclasses
 import enum
-import json
+import functools
+import logging
+import os
 import re
+import selectors
+import shutil
 import signal
 import subprocess
+import sys
 import time
 from contextlib import AbstractContextManager, contextmanager, ExitStack
 from typing import Callable, Generator, NamedTuple, Optional
-from urllib.parse import parse_qs, urlparse
 
-import retry
 import typer
-from rich.console import Console
 
-err_console = Console(stderr=True)
+try:
+    # Much faster C parser, installed via the "fast" extra
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+logger = logging.getLogger(__name__)
 
 
 class DelayedKeyboardInterrupt:
-    def __init__(self, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
+    __slots__ = ("interrupt_data", "original_handler")
+
+    def __init__(self) -> None:
         self.interrupt_data = None
         self.original_handler = None
 
@@ -48,10 +57,6 @@ class DelayedKeyboardInterruptExitStack(ExitStack):
             return super().__exit__(*args, **kwargs)
 
 
-def preexec_ignore_sigint():
-    signal.signal(signal.SIGINT, signal.SIG_IGN)
-
-
 def handle_sighup(signum, frame):
     log_error("Hangup received, terminating job.")
     raise typer.Exit(code=1)
@@ -76,7 +81,10 @@ class RunAIJobStatus(enum.Enum):
 
     @classmethod
     def from_str(cls, value: str) -> "RunAIJobStatus":
-        return getattr(cls, value.upper(), RunAIJobStatus.NOT_READY)
+        return _STATUS_BY_NAME.get(value.upper(), cls.NOT_READY)
+
+
+_STATUS_BY_NAME = {status.name: status for status in RunAIJobStatus}
 
 
 class RunAIJobDetails(NamedTuple):
@@ -91,58 +99,145 @@ class JupyterConnectionDetails(NamedTuple):
 
 
 def log_error(msg: str):
-    err_console.print(f"ERROR: {msg}")
+    if sys.stderr.isatty():
+        sys.stderr.write(f"\033[31mERROR:\033[0m {msg}\n")
+    else:
+        sys.stderr.write(f"ERROR: {msg}\n")
 
 
-def check_command(*command: str) -> bool:
-    """Check whether the command executed successfully
+@functools.lru_cache(maxsize=32)
+def check_command(command: str) -> bool:
+    """Check whether the command is available on PATH
 
     Args:
-        command (list[str]): The command to check
+        command (str): The command to look up
 
     Returns:
-        bool: True if the command executed successfully,
-            False on non-zero return code.
+        bool: True if an executable with that name is on PATH.
     """
-    try:
-        process = subprocess.run(command, capture_output=True)
-    except FileNotFoundError:
-        return False
-    return process.returncode == 0
+    return shutil.which(command) is not None
+
+
+@dataclasses.dataclass
+class _JobStatusCache:
+    """Cache of job statuses fed by a single `runai list` call.
+
+    One listing answers lookups for every job until the TTL expires, so
+    repeated polls (or several watched jobs) share one subprocess fork.
+    Chief names never change once assigned, so a non-empty one is kept
+    indefinitely; before assignment runai reports an empty string, which
+    must not be pinned.
+    """
+
+    ttl_seconds: float = 2.0
+    _statuses: dict = dataclasses.field(default_factory=dict)
+    _chief_names: dict = dataclasses.field(default_factory=dict)
+    _fetched_at: float = float("-inf")
+
+    def invalidate(self):
+        self._fetched_at = float("-inf")
+
+    def _refresh(self):
+        process = subprocess.run(
+            ["runai", "list", "--output", "json"], capture_output=True
+        )
+        self._statuses = {}
+        self._fetched_at = time.monotonic()
+        if process.returncode != 0:
+            return
+        for payload in _json_loads(process.stdout):
+            name = payload["name"]
+            self._statuses[name] = RunAIJobStatus.from_str(payload["status"])
+            if payload["chiefName"]:
+                self._chief_names[name] = payload["chiefName"]
+
+    def get(self, job_name: str) -> RunAIJobDetails:
+        if time.monotonic() - self._fetched_at > self.ttl_seconds:
+            self._refresh()
+        status = self._statuses.get(job_name)
+        if status is None:
+            return RunAIJobDetails(job_name, job_name, RunAIJobStatus.DOES_NOT_EXISTS)
+        return RunAIJobDetails(job_name, self._chief_names.get(job_name, ""), status)
+
+
+_job_status_cache = _JobStatusCache()
 
 
 def get_runai_job_status(job_name: str) -> RunAIJobDetails:
-    process = subprocess.run(
-        ["runai", "describe", "job", job_name, "--output", "json"], capture_output=True
-    )
-    if process.returncode != 0:
-        return RunAIJobDetails(job_name, job_name, RunAIJobStatus.DOES_NOT_EXISTS)
-
-    payload = json.loads(process.stdout)
-    return RunAIJobDetails(
-        payload["name"],
-        payload["chiefName"],
-        RunAIJobStatus.from_str(payload["status"]),
-    )
+    return _job_status_cache.get(job_name)
+
+
+# Pod phases and container waiting reasons reported by the kubectl
+# watch, mapped to job statuses
+_POD_STATUS_MAP = {
+    b"Pending": RunAIJobStatus.PENDING,
+    b"Running": RunAIJobStatus.RUNNING,
+    b"ContainerCreating": RunAIJobStatus.CONTAINERCREATING,
+    b"ErrImagePull": RunAIJobStatus.IMAGEPULLBACKOFF,
+    b"ImagePullBackOff": RunAIJobStatus.IMAGEPULLBACKOFF,
+}
+
+# Messages printed once when the job first enters a status
+_TRANSITION_MESSAGES = {
+    RunAIJobStatus.CONTAINERCREATING: ("Creating container...",),
+}
+
+
+def kubectl_watch_extract_pod_status(stdout_line: bytes) -> RunAIJobStatus:
+    # The line holds the pod phase followed by any container waiting
+    # reasons; a known reason is more specific than the phase, so the
+    # last recognized token wins.
+    status = RunAIJobStatus.NOT_READY
+    for token in stdout_line.split():
+        status = _POD_STATUS_MAP.get(token, status)
+    return status
 
 
 def wait_until_job_started(job_name: str) -> RunAIJobDetails:
-    notified_container_creating = False
-    while (job := get_runai_job_status(job_name)).status != RunAIJobStatus.RUNNING:
-        if job.status == RunAIJobStatus.DOES_NOT_EXISTS:
-            log_error(f"Job {job_name} does not exists.")
-            raise typer.Exit(code=1)
-        if job.status == RunAIJobStatus.IMAGEPULLBACKOFF:
-            log_error("Couldn't pull the image, are you sure it exists?")
-            raise typer.Exit(code=1)
-        if (
-            job.status == RunAIJobStatus.CONTAINERCREATING
-            and not notified_container_creating
-        ):
-            print("Creating container...")
-            notified_container_creating = True
-        time.sleep(5)
-    return job
+    job = get_runai_job_status(job_name)
+    if job.status == RunAIJobStatus.DOES_NOT_EXISTS:
+        log_error(f"Job {job_name} does not exists.")
+        raise typer.Exit(code=1)
+    if job.status == RunAIJobStatus.RUNNING:
+        return job
+
+    last_status = job.status
+    with subprocess.Popen(
+        [
+            "kubectl",
+            "get",
+            "pod",
+            "--selector",
+            f"job-name={job_name}",
+            "--watch",
+            "-o=jsonpath={.status.phase} "
+            '{.status.containerStatuses[*].state.waiting.reason}{"\\n"}',
+        ],
+        stdout=subprocess.PIPE,
+    ) as proc:
+        assert proc.stdout is not None
+        try:
+            for line in proc.stdout:
+                status = kubectl_watch_extract_pod_status(line)
+                if status == last_status:
+                    continue
+                if status == RunAIJobStatus.RUNNING:
+                    # Re-fetch so callers see the pod name assigned at
+                    # start, not the pre-submission placeholder
+                    _job_status_cache.invalidate()
+                    job = get_runai_job_status(job_name)
+                    return RunAIJobDetails(job.name, job.pod_name, status)
+                if status == RunAIJobStatus.IMAGEPULLBACKOFF:
+                    log_error("Couldn't pull the image, are you sure it exists?")
+                    raise typer.Exit(code=1)
+                for message in _TRANSITION_MESSAGES.get(status, ()):
+                    print(message)
+                last_status = status
+        finally:
+            proc.terminate()
+
+    log_error(f"Job {job_name} stopped before it could start.")
+    raise typer.Exit(code=1)
 
 
 @dataclasses.dataclass
@@ -160,7 +255,9 @@ class RunAIInteractiveJob(AbstractContextManager[RunAIJobDetails]):
             self.image,
             "--interactive",
         ] + self.command
-        print(f"Submitting job: {' '.join(job_cmd)}")
+        # Lazy %s formatting: the argv list is only rendered if a
+        # handler actually emits the record
+        logger.info("Submitting job: %s", job_cmd)
         process = subprocess.run(job_cmd)
         if process.returncode != 0:
             log_error("Could not submit job to RunAI")
@@ -172,20 +269,22 @@ class RunAIInteractiveJob(AbstractContextManager[RunAIJobDetails]):
         return self.submit()
 
     def __exit__(self, *args, **kwargs):
+        # start_new_session detaches the child from our terminal's
+        # process group so a Ctrl-C aimed at us does not kill the
+        # cleanup, without a preexec_fn that would force a slow fork.
         subprocess.run(
-            ["runai", "delete", "job", self.job_name], preexec_fn=preexec_ignore_sigint
+            ["runai", "delete", "job", self.job_name], start_new_session=True
         )
 
 
-def kubectl_output_extract_forwarded_port(stdout_line: bytes) -> Optional[int]:
-    if not stdout_line.startswith(b"Forwarding"):
-        return None
+# Captures the local port in "Forwarding from 127.0.0.1:12345 -> 8888";
+# MULTILINE so it also anchors inside a buffered chunk of output
+_FWD_RE = re.compile(rb"^Forwarding from \S+:(\d+) -> \d+", re.MULTILINE)
+
 
-    # Keep after ":" in 127.0.0.1:12345 -> 8888
-    _, ports_map = stdout_line.split(b":")
-    # Take the source port
-    src_port, _ = ports_map.split(b" -> ")
-    return int(src_port)
+def kubectl_output_extract_forwarded_port(stdout_line: bytes) -> Optional[int]:
+    match = _FWD_RE.match(stdout_line)
+    return int(match.group(1)) if match else None
 
 
 @contextmanager
@@ -198,18 +297,40 @@ def kubectl_pod_forward_port(
         stderr=subprocess.PIPE,
     ) as proc:
         assert proc.stdout is not None
-        for line in proc.stdout:
-            port = kubectl_output_extract_forwarded_port(line)
-            if port is not None:
-                try:
-                    yield port
-                finally:
-                    proc.terminate()
+        # Poll the pipe with a timeout instead of blocking in readline,
+        # so signals are serviced within a second while we wait.
+        sel = selectors.DefaultSelector()
+        sel.register(proc.stdout, selectors.EVENT_READ)
+        buffer = b""
+        try:
+            while True:
+                for _key, _events in sel.select(timeout=1.0):
+                    chunk = os.read(proc.stdout.fileno(), 4096)
+                    if not chunk:
+                        log_error("kubectl port-forward stopped unexpectedly.")
+                        raise typer.Exit(code=1)
+                    buffer += chunk
+                    match = _FWD_RE.search(buffer)
+                    if match is not None:
+                        yield int(match.group(1))
+                        return
+        finally:
+            sel.close()
+            proc.terminate()
 
 
 def _wait_until_interrupted():
-    while True:
-        time.sleep(10)
+    # Blocks without periodic wakeups; SIGINT/SIGHUP still get through
+    # since their handlers run on the main thread.
+    if hasattr(signal, "pause"):
+        # Loop to guard against signals whose handlers return
+        while True:
+            signal.pause()
+    else:
+        # Windows has no signal.pause, but Event.wait is interrupt-aware
+        import threading
+
+        threading.Event().wait()
 
 
 def _handle_shell_context(job: RunAIJobDetails):
@@ -231,30 +352,57 @@ def _handle_port_context(
     _wait_until_interrupted()
 
 
-URL_RE = re.compile(rb"http\S+")
+# Matches only Jupyter-style URLs with an inline token, capturing the
+# "s" of https, the optional port and the token in one scan. Tokens are
+# any URL-unreserved characters, not just hex digits. The lazy host
+# match lets the port group claim a trailing :port while still allowing
+# colons inside bracketed IPv6 hosts.
+JUPYTER_URL_RE = re.compile(
+    rb"http(s?)://[^\s/]+?(?::(\d+))?/\S*[?&]token=([A-Za-z0-9._~-]+)"
+)
 
 
 def find_jupyter_details_in_logs(line: bytes) -> Optional[JupyterConnectionDetails]:
-    urls: list[bytes] = URL_RE.findall(line)
-    for url in urls:
-        url_obj = urlparse(url.decode())
-        token = parse_qs(url_obj.query).get("token")
-        if token:
-            port = url_obj.port
-            if port is None:
-                port = 80 if url_obj.scheme == "http" else 443
-            return JupyterConnectionDetails(port, token[0])
-
-
-@retry.retry((subprocess.CalledProcessError, ValueError), delay=10, tries=20)
-def extract_jupyter_details_from_job(job_name: str) -> JupyterConnectionDetails:
-    proc = subprocess.run(["runai", "logs", job_name], capture_output=True)
-    proc.check_returncode()
-    jupyter_details = find_jupyter_details_in_logs(proc.stdout)
-    if not jupyter_details:
-        raise ValueError("No jupyter details found")
+    match = JUPYTER_URL_RE.search(line)
+    if match is None:
+        return None
+    secure, port, token = match.groups()
+    return JupyterConnectionDetails(
+        int(port) if port else (443 if secure else 80), token.decode()
+    )
+
 
-    return jupyter_details
+def _stream_jupyter_details(job_name: str) -> Optional[JupyterConnectionDetails]:
+    with subprocess.Popen(
+        ["runai", "logs", job_name, "--follow"], stdout=subprocess.PIPE
+    ) as proc:
+        assert proc.stdout is not None
+        try:
+            for line in proc.stdout:
+                jupyter_details = find_jupyter_details_in_logs(line)
+                if jupyter_details:
+                    return jupyter_details
+        finally:
+            proc.terminate()
+    return None
+
+
+def extract_jupyter_details_from_job(job_name: str) -> JupyterConnectionDetails:
+    # Deferred: only the jupyter mode pays for this import
+    import random
+
+    # The log stream can end without a match while the container is
+    # still starting up; retry with exponential backoff and jitter
+    # (0.5s doubling to a 5s cap, ~30s worst case overall).
+    delay = 0.5
+    for attempt in range(8):
+        jupyter_details = _stream_jupyter_details(job_name)
+        if jupyter_details:
+            return jupyter_details
+        if attempt < 7:
+            time.sleep(delay + random.random() * 0.1)
+            delay = min(delay * 2, 5)
+    raise ValueError("No jupyter details found")
 
 
 def _handle_jupyter_context(exit_stack: ExitStack, job: RunAIJobDetails):
@@ -280,7 +428,7 @@ def interactive_context(
 ):
     args = args or []
     # Checking the runai is available
-    if not check_command("runai", "--help"):
+    if not check_command("runai"):
         log_error("Could not find the runai CLI")
         raise typer.Exit(code=1)
 
@@ -311,4 +459,5 @@ def interactive_context(
 
 
 def main():
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
     typer.run(interactive_context)
@@ -17,3 +17,27 @@ def test_extract_jupyter_details_from_job():
     ) == JupyterConnectionDetails(
         8970, "0ae67ae0f222ac82b321b33cb94b6f843725376b16b36975"
     )
+
+
+def test_find_jupyter_details_non_hex_token():
+    assert find_jupyter_details_in_logs(
+        b"http://localhost:8888/lab?token=abc.DEF~1-2"
+    ) == JupyterConnectionDetails(8888, "abc.DEF~1-2")
+
+
+def test_find_jupyter_details_default_ports():
+    assert find_jupyter_details_in_logs(
+        b"http://example.org/?token=abc"
+    ) == JupyterConnectionDetails(80, "abc")
+    assert find_jupyter_details_in_logs(
+        b"https://example.org/?token=abc"
+    ) == JupyterConnectionDetails(443, "abc")
+
+
+def test_find_jupyter_details_ipv6_host():
+    assert find_jupyter_details_in_logs(
+        b"http://[::1]:8888/?token=0ae67ae0"
+    ) == JupyterConnectionDetails(8888, "0ae67ae0")
+    assert find_jupyter_details_in_logs(
+        b"http://[::1]/?token=0ae67ae0"
+    ) == JupyterConnectionDetails(80, "0ae67ae0")
@@ -0,0 +1,26 @@
+from runai_interactive_context.cli import (
+    RunAIJobStatus,
+    kubectl_watch_extract_pod_status,
+)
+
+
+def test_kubectl_watch_extract_pod_status():
+    assert kubectl_watch_extract_pod_status(b"Running \n") == RunAIJobStatus.RUNNING
+    assert (
+        kubectl_watch_extract_pod_status(b"Pending ContainerCreating\n")
+        == RunAIJobStatus.CONTAINERCREATING
+    )
+    assert (
+        kubectl_watch_extract_pod_status(b"Pending ImagePullBackOff\n")
+        == RunAIJobStatus.IMAGEPULLBACKOFF
+    )
+    assert (
+        kubectl_watch_extract_pod_status(b"Pending ErrImagePull\n")
+        == RunAIJobStatus.IMAGEPULLBACKOFF
+    )
+    # Unknown waiting reasons fall back to the phase
+    assert (
+        kubectl_watch_extract_pod_status(b"Pending CrashLoopBackOff\n")
+        == RunAIJobStatus.PENDING
+    )
+    assert kubectl_watch_extract_pod_status(b"\n") == RunAIJobStatus.NOT_READY